@@ -0,0 +1,283 @@
+# cython: language_level=3, boundscheck=False, wraparound=False
+"""
+Compiled drop-in replacement for the pure-Python quaternion class.
+
+quaternion.py imports `quaternion` from here when the extension is built
+(`$ python setup.py build_ext --inplace`) and keeps its own class otherwise.
+Coefficients are plain C doubles, so arithmetic never boxes intermediate values.
+"""
+
+from numbers import Real
+from libc.math cimport sin, cos, atan2, hypot
+
+
+cdef inline quaternion _new(double a, double b, double c, double d):
+    """Form a quaternion from C doubles, skipping __init__."""
+    cdef quaternion r = quaternion.__new__(quaternion)
+    r.a = a
+    r.b = b
+    r.c = c
+    r.d = d
+    return r
+
+
+cdef class quaternion:
+    """
+    Class which represents quaternions
+
+    https://en.wikipedia.org/wiki/Quaternion
+    overloads same ariphmetic operators as expected by numbers.Complex
+    https://docs.python.org/3/library/numbers.html#numbers.Complex
+
+    Quaternions compare and hash by value, but a, b, c and d stay writable.
+    Do not change the coefficients of a quaternion once it is used as a dict key
+    or a set member: its hash changes with them and the lookup breaks.
+    """
+
+    cdef public double a, b, c, d
+
+    def __init__(self, double a = 0, double b = 0, double c = 0, double d = 0):
+        """
+        Form a quaternion from real coefficients
+
+        (a + bi + cj + dk)
+        """
+        self.a = a
+        self.b = b
+        self.c = c
+        self.d = d
+
+    def to_tuple(self):
+        """
+        Return coefficients of a quaternion in a tuple.
+
+        quaternion(a, b, c, d) -> tuple(a, b, c, d)
+        """
+        return (self.a, self.b, self.c, self.d)
+
+    def to_imag(self):
+        """
+        Return imaginary part of a quaternion.
+
+        quaternion(a, b, c, d) -> quaternion(0, b, c, d)
+        """
+        return _new(0, self.b, self.c, self.d)
+
+    def to_imag_tuple(self):
+        """
+        Return coefficients of imaginary part of a quaternion in a tuple.
+
+        quaternion(a, b, c, d) -> tuple(b, c, d)
+        """
+        return (self.b, self.c, self.d)
+
+    def __add__(self, other):
+        """
+        Add quaternion or a Real number to a quaternion.
+
+        quaternion + (quaternion | Real)
+        """
+        cdef quaternion o
+        if isinstance(other, quaternion):
+            o = other
+            return _new(self.a + o.a, self.b + o.b, self.c + o.c, self.d + o.d)
+        if isinstance(other, Real):
+            return _new(self.a + <double>other, self.b, self.c, self.d)
+        return NotImplemented
+
+    def __radd__(self, other):
+        """
+        Add a quaternion to a real number
+
+        Real + quaternion
+        """
+        if isinstance(other, Real):
+            return _new(<double>other + self.a, self.b, self.c, self.d)
+        return NotImplemented
+
+    def __mul__(self, other):
+        """
+        Multiply quaternion by a quaternion or a Real number.
+
+        quaternion * (quaternion | Real)
+        """
+        cdef quaternion o
+        cdef double k
+        if isinstance(other, quaternion):
+            o = other
+            return _new(
+                self.a * o.a - self.b * o.b - self.c * o.c - self.d * o.d,
+                self.a * o.b + self.b * o.a + self.c * o.d - self.d * o.c,
+                self.a * o.c - self.b * o.d + self.c * o.a + self.d * o.b,
+                self.a * o.d + self.b * o.c - self.c * o.b + self.d * o.a)
+        if isinstance(other, Real):
+            k = other
+            return _new(self.a * k, self.b * k, self.c * k, self.d * k)
+        return NotImplemented
+
+    def __rmul__(self, other):
+        """
+        Multiply a Real number by a quaternion.
+
+        Real * quaternion
+        """
+        cdef double k
+        if isinstance(other, Real):
+            k = other
+            return _new(k * self.a, k * self.b, k * self.c, k * self.d)
+        return NotImplemented
+
+    def __abs__(self):
+        """
+        Return an absolute value of a quaternion.
+
+        abs(quaternion) -> |quaternion|
+        """
+        return hypot(hypot(self.a, self.b), hypot(self.c, self.d))
+
+    def __bool__(self):
+        """Check if a quaternion is strictly not equal to zero."""
+        return self.a != 0 or self.b != 0 or self.c != 0 or self.d != 0
+
+    def __neg__(self):
+        """
+        Return unary negative of a quaternion.
+
+        -quaternion -> -1 * quaternion
+        """
+        return _new(-self.a, -self.b, -self.c, -self.d)
+
+    def __pos__(self):
+        """
+        Return unary positive of a quaternion. Identity function.
+
+        +quaternion -> quaternion
+        """
+        return self
+
+    def __sub__(self, other):
+        """
+        Substruct quaternion or a Real number from a quaternion.
+
+        quaternion - (quaternion | Real)
+        """
+        cdef quaternion o
+        if isinstance(other, quaternion):
+            o = other
+            return _new(self.a - o.a, self.b - o.b, self.c - o.c, self.d - o.d)
+        if isinstance(other, Real):
+            return _new(self.a - <double>other, self.b, self.c, self.d)
+        return NotImplemented
+
+    def __rsub__(self, other):
+        """
+        Substruct a quaternion from a real number.
+
+        Real - quaternion
+        """
+        if isinstance(other, Real):
+            return _new(<double>other - self.a, -self.b, -self.c, -self.d)
+        return NotImplemented
+
+    def conjugate(self):
+        """
+        Return conjugate of a quaternion.
+
+        quaternion(a, b, c, d) -> quaternion(a, -b, -c, -d)
+        """
+        return _new(self.a, -self.b, -self.c, -self.d)
+
+    def __truediv__(self, other):
+        """
+        Return result of an algebraic division.
+
+        Algebraic in a sense of: a / a := a * invert(a) = 1
+                                 b / a := b * invert(a)
+
+        ! WARNING !   b / a == b * invert(a) != invert(a) * b
+        ! WARNING !   Multiplication is not commutative.
+        ! WARNING !   Use division with caution.
+
+        Accepts both quaternion and Real.
+        """
+        cdef double k
+        if isinstance(other, Real):
+            k = 1 / <double>other
+            return _new(self.a * k, self.b * k, self.c * k, self.d * k)
+        if isinstance(other, quaternion):
+            from quaternion import qmath
+            return self * qmath.invert(other)
+        return NotImplemented
+
+    def __rtruediv__(self, other):
+        """Return result of an algebraic division."""
+        if isinstance(other, Real):
+            from quaternion import qmath
+            return other * qmath.invert(self)
+        return NotImplemented
+
+    def __pow__(self, other, modulo=None):
+        """Return result of exponentiation with a base self and exponent other."""
+        from quaternion import qmath
+        return qmath.pow(self, other)
+
+    def __rpow__(self, other, modulo=None):
+        """Return result of exponentiation with a base other and exponent self."""
+        if isinstance(other, Real):
+            from quaternion import qmath
+            return qmath.pow(other, self)
+        return NotImplemented
+
+    def __eq__(self, other):
+        """Check if a quaternion is exactly equal in value to a quaternion or a Real number."""
+        cdef quaternion o
+        if isinstance(other, quaternion):
+            o = other
+            return self.a == o.a and self.b == o.b and self.c == o.c and self.d == o.d
+        if isinstance(other, Real):
+            return self.a == other and self.b == 0 and self.c == 0 and self.d == 0
+        return NotImplemented
+
+    def __hash__(self):
+        """
+        Return hash of a quaternion.
+
+        Equal to the hash of a Real number if the quaternion is equal to it.
+        """
+        if self.b == 0 and self.c == 0 and self.d == 0:
+            return hash(self.a)
+        return hash((self.a, self.b, self.c, self.d))
+
+    def __repr__(self):
+        """Return representation of a quaternion as a string."""
+        return "quaternion({}, {}, {}, {})".format(self.a, self.b, self.c, self.d)
+
+    def __reduce__(self):
+        return (quaternion, (self.a, self.b, self.c, self.d))
+
+    @classmethod
+    def from_rotation(cls, rotation):
+        """
+        Form an appropriate quaternion from a Rotation.
+
+        https://en.wikipedia.org/wiki/Quaternions_and_spatial_rotation#Using_quaternions_as_rotations
+        """
+        cdef double ax, ay, az, radians, k
+        (ax, ay, az), radians = rotation
+        k = sin(radians / 2) / hypot(hypot(ax, ay), az)
+        if cls is quaternion:
+            return _new(cos(radians / 2), ax * k, ay * k, az * k)
+        return cls(cos(radians / 2), ax * k, ay * k, az * k)
+
+    def to_rotation(self):
+        """
+        Form the Rotation with an axis and an angle from a quaternion.
+
+        Rotation should be normalized.
+        A quaternion without imaginary part is the identity rotation: ((1, 0, 0), 0).
+        https://en.wikipedia.org/wiki/Quaternions_and_spatial_rotation#Recovering_the_axis-angle_representation
+        """
+        cdef double av = hypot(hypot(self.b, self.c), self.d)
+        if av == 0:
+            return ((1.0, 0.0, 0.0), 0.0)
+        return ((self.b / av, self.c / av, self.d / av), 2 * atan2(av, self.a))
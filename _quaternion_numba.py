@@ -0,0 +1,31 @@
+#!/usr/bin/env python
+"""
+Optional Numba kernels for quaternion.qmath.
+
+Importing this module fails with ImportError when numba is not installed,
+in which case qmath falls back to the NumPy implementations.
+"""
+
+from numba import njit  # type: ignore
+
+
+@njit(cache=True, fastmath=True)
+def rotate_kernel(P, w, x, y, z, out):
+    """
+    Rotate every row of P by the unit quaternion (w, x, y, z) and write it to out.
+
+    P, out - float64 arrays of shape (N, 3).
+
+    Same formula as qmath.rotate_by_quaternion.
+    Numba does not check bounds, so shapes are checked here.
+    """
+    if P.shape[1] != 3 or out.shape[0] != P.shape[0] or out.shape[1] != 3:
+        raise ValueError("Expected P and out of shape (N, 3)")
+    for i in range(P.shape[0]):
+        vx, vy, vz = P[i, 0], P[i, 1], P[i, 2]
+        tx = 2 * (y * vz - z * vy)
+        ty = 2 * (z * vx - x * vz)
+        tz = 2 * (x * vy - y * vx)
+        out[i, 0] = vx + w * tx + y * tz - z * ty
+        out[i, 1] = vy + w * ty + z * tx - x * tz
+        out[i, 2] = vz + w * tz + x * ty - y * tx
@@ -26,7 +26,8 @@ def main():
     axis = (0, 0, 1)
     angle = - pi / 2
 
-    new_points = list(map(lambda p: qmath.rotate(p, (axis, angle)), points))
+    rq = qmath.as_rotationq((axis, angle))
+    new_points = [qmath.rotate(p, rq) for p in points]
     print("Before rotation")
     print(",\n".join(map(lambda x: "({:4.1f}, {:4.1f}, {:4.1f})".format(*x), points)))
     print("After  rotation")
@@ -3,9 +3,18 @@ from __future__ import annotations
 # to use quaternion as a type hint inside the quaternion class
 
 from numbers import Real
+from typing import NamedTuple
+import functools
 import math
 
-type Vec3 = tuple[Real, Real, Real] # j
+import numpy as np
+
+try:
+    from _quaternion_numba import rotate_kernel as _rotate_kernel
+except ImportError:
+    _rotate_kernel = None  # type: ignore[assignment]
+
+Vec3 = tuple[float, float, float] # j
 """
 Type representing an axis of rotation or a vector which is rotated.
 
@@ -13,10 +22,23 @@ All functions where Vec3 represents an axis should theoretically expect normaliz
 I decided to normalize them anyway in those functions.
 """
 
-type Rotation = tuple[Vec3, Real]   # type representing rotation (axis, angle in radians)
+Rotation = tuple[Vec3, float]   # type representing rotation (axis, angle in radians)
 # https://commons.wikimedia.org/wiki/File:Euler_AxisAngle.svg
 
 
+class RotationQ(NamedTuple):
+    """
+    Rotation stored as coefficients of its unit quaternion (w + xi + yj + zk).
+
+    Made once with qmath.as_rotationq, then applied any number of times by qmath.rotate
+    without recomputing sin, cos and the axis length.
+    """
+    w: float
+    x: float
+    y: float
+    z: float
+
+
 class quaternion:
     """
     Class which represents quaternions
@@ -24,23 +46,29 @@ class quaternion:
     https://en.wikipedia.org/wiki/Quaternion
     overloads same ariphmetic operators as expected by numbers.Complex
     https://docs.python.org/3/library/numbers.html#numbers.Complex
+
+    Quaternions compare and hash by value, but a, b, c and d stay writable.
+    Do not change the coefficients of a quaternion once it is used as a dict key
+    or a set member: its hash changes with them and the lookup breaks.
     """
 
-    def __init__(self, a: Real = 0,
-                       b: Real = 0,
-                       c: Real = 0,
-                       d: Real = 0):
+    __slots__ = ('a', 'b', 'c', 'd')
+
+    def __init__(self, a: float = 0,
+                       b: float = 0,
+                       c: float = 0,
+                       d: float = 0):
         """
         Form a quaternion from real coefficients
 
         (a + bi + cj + dk)
         """
-        self.a: Real = a
-        self.b: Real = b
-        self.c: Real = c
-        self.d: Real = d
+        self.a: float = a
+        self.b: float = b
+        self.c: float = c
+        self.d: float = d
 
-    def to_tuple(self) -> tuple[Real, Real, Real, Real]:
+    def to_tuple(self) -> tuple[float, float, float, float]:
         """
         Return coefficients of a quaternion in a tuple.
 
@@ -54,9 +82,17 @@ class quaternion:
 
         quaternion(a, b, c, d) -> quaternion(0, b, c, d)
         """
-        return quaternion(0, *(self.to_tuple()[1:]))
+        return quaternion(0, *self.to_imag_tuple())
 
-    def __add__(self, other: quaternion | Real) -> quaternion:
+    def to_imag_tuple(self) -> Vec3:
+        """
+        Return coefficients of imaginary part of a quaternion in a tuple.
+
+        quaternion(a, b, c, d) -> tuple(b, c, d)
+        """
+        return (self.b, self.c, self.d)
+
+    def __add__(self, other: quaternion | float) -> quaternion:
         """
         Add quaternion or a Real number to a quaternion.
 
@@ -69,9 +105,10 @@ class quaternion:
                 self.c + other.c,
                 self.d + other.d)
         if isinstance(other, Real):
-            return quaternion(other) + self
+            return quaternion(self.a + other, self.b, self.c, self.d)
+        return NotImplemented
 
-    def __radd__(self, other: Real) -> quaternion:
+    def __radd__(self, other: float) -> quaternion:
         """
         Add a quaternion to a real number
 
@@ -79,23 +116,31 @@ class quaternion:
         """
         if isinstance(other, Real):
             return self + other
+        return NotImplemented
 
-    def __mul__(self, other: quaternion | Real) -> quaternion:
+    def __mul__(self, other: quaternion | float) -> quaternion:
         """
         Multiply quaternion by a quaternion or a Real number.
 
         quaternion * (quaternion | Real)
         """
-        if isinstance(other, Real):
-            return self * (quaternion() + other)
         if isinstance(other, quaternion):
+            sa, sb, sc, sd = self.a, self.b, self.c, self.d
+            oa, ob, oc, od = other.a, other.b, other.c, other.d
             return quaternion(
-                self.a * other.a - self.b * other.b - self.c * other.c - self.d * other.d,
-                self.a * other.b + self.b * other.a + self.c * other.d - self.d * other.c,
-                self.a * other.c - self.b * other.d + self.c * other.a + self.d * other.b,
-                self.a * other.d + self.b * other.c - self.c * other.b + self.d * other.a)
+                sa * oa - sb * ob - sc * oc - sd * od,
+                sa * ob + sb * oa + sc * od - sd * oc,
+                sa * oc - sb * od + sc * oa + sd * ob,
+                sa * od + sb * oc - sc * ob + sd * oa)
+        if isinstance(other, Real):
+            return self._mul_scalar(other)
+        return NotImplemented
+
+    def _mul_scalar(self, other: float) -> quaternion:
+        """Multiply quaternion by a Real number."""
+        return quaternion(self.a * other, self.b * other, self.c * other, self.d * other)
 
-    def __rmul__(self, other: Real) -> quaternion:
+    def __rmul__(self, other: float) -> quaternion:
         """
         Multiply a Real number by a quaternion.
 
@@ -103,22 +148,19 @@ class quaternion:
         """
         if isinstance(other, Real):
             return self * other
+        return NotImplemented
 
-    def __abs__(self) -> Real:
+    def __abs__(self) -> float:
         """
         Return an absolute value of a quaternion.
 
         abs(quaternion) -> |quaternion|
         """
-        sqr = (self.a * self.a +
-               self.b * self.b +
-               self.c * self.c +
-               self.d * self.d)
-        return math.sqrt(sqr)
+        return math.hypot(self.a, self.b, self.c, self.d)
 
     def __bool__(self) -> bool:
         """Check if a quaternion is strictly not equal to zero."""
-        return any(self.to_tuple())
+        return self.a != 0 or self.b != 0 or self.c != 0 or self.d != 0
 
     def __neg__(self) -> quaternion:
         """
@@ -126,7 +168,7 @@ class quaternion:
 
         -quaternion -> -1 * quaternion
         """
-        return -1 * self
+        return quaternion(-self.a, -self.b, -self.c, -self.d)
 
     def __pos__(self) -> quaternion:
         """
@@ -136,15 +178,19 @@ class quaternion:
         """
         return self
 
-    def __sub__(self, other: quaternion | Real) -> quaternion:
+    def __sub__(self, other: quaternion | float) -> quaternion:
         """
         Substruct quaternion or a Real number from a quaternion.
 
         quaternion - (quaternion | Real)
         """
-        return self + (-other)
+        if isinstance(other, quaternion):
+            return quaternion(self.a - other.a, self.b - other.b, self.c - other.c, self.d - other.d)
+        if isinstance(other, Real):
+            return self + (-other)
+        return NotImplemented
     
-    def __rsub__(self, other: Real) -> quaternion:
+    def __rsub__(self, other: float) -> quaternion:
         """
         Substruct a quaternion from a real number.
 
@@ -152,6 +198,7 @@ class quaternion:
         """
         if isinstance(other, Real):
             return other + (-self)
+        return NotImplemented
 
     def conjugate(self) -> quaternion:
         """
@@ -161,7 +208,7 @@ class quaternion:
         """
         return quaternion(self.a, -self.b, -self.c, -self.d)
 
-    def __truediv__(self, other: quaternion | Real) -> quaternion:
+    def __truediv__(self, other: quaternion | float) -> quaternion:
         """
         Return result of an algebraic division.
 
@@ -177,21 +224,42 @@ class quaternion:
         if isinstance(other, Real):
             return self * (1 / other)
         if isinstance(other, quaternion):
-            return self * qmath.invert(quaternion)
+            return self * qmath.invert(other)
+        return NotImplemented
 
-    def __rtruediv(self, other: Real) -> quaternion:
+    def __rtruediv__(self, other: float) -> quaternion:
         """Return result of an algebraic division."""
         if isinstance(other, Real):
             return other * qmath.invert(self)
+        return NotImplemented
 
-    def __pow__(self, other: quaternion | Real) -> quaternion:
+    def __pow__(self, other: quaternion | float) -> quaternion:
         """Return result of exponentiation with a base self and exponent other."""
         return qmath.pow(self, other)
 
-    def __rpow__(self, other: Real) -> quaternion:
+    def __rpow__(self, other: float) -> quaternion:
         """Return result of exponentiation with a base other and exponent self."""
         if isinstance(other, Real):
             return qmath.pow(other, self)
+        return NotImplemented
+
+    def __eq__(self, other: object) -> bool:
+        """Check if a quaternion is exactly equal in value to a quaternion or a Real number."""
+        if isinstance(other, quaternion):
+            return self.a == other.a and self.b == other.b and self.c == other.c and self.d == other.d
+        if isinstance(other, Real):
+            return self.a == other and self.b == 0 and self.c == 0 and self.d == 0
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        """
+        Return hash of a quaternion.
+
+        Equal to the hash of a Real number if the quaternion is equal to it.
+        """
+        if self.b == 0 and self.c == 0 and self.d == 0:
+            return hash(self.a)
+        return hash((self.a, self.b, self.c, self.d))
 
     def __repr__(self) -> str:
         """Return representation of a quaternion as a string."""
@@ -205,16 +273,33 @@ class quaternion:
         https://en.wikipedia.org/wiki/Quaternions_and_spatial_rotation#Using_quaternions_as_rotations
         """
         axis, radians = rotation
-        return math.cos(radians / 2) + qmath.normalized(cls(0, *axis)) * math.sin(radians / 2)
+        return cls(*_rotation_coefficients(*axis, radians))
 
     def to_rotation(self) -> Rotation:
         """
         Form the Rotation with an axis and an angle from a quaternion.
 
         Rotation should be normalized.
+        A quaternion without imaginary part is the identity rotation: ((1, 0, 0), 0).
         https://en.wikipedia.org/wiki/Quaternions_and_spatial_rotation#Recovering_the_axis-angle_representation
         """
-        return (qmath.normalized(self.to_imag())[1:], 2 * math.atan2(abs(self.to_imag()), self.a))
+        a, b, c, d = self.a, self.b, self.c, self.d
+        av = math.hypot(b, c, d)
+        if av == 0:
+            return ((1.0, 0.0, 0.0), 0.0)
+        return ((b / av, c / av, d / av), 2 * math.atan2(av, a))
+
+
+_CONJ_MASK = np.array([0, 1 << 63, 1 << 63, 1 << 63], dtype=np.uint64)
+"""Sign bits of the imaginary coefficients of a float64 quaternion."""
+
+
+@functools.lru_cache(maxsize=256)
+def _rotation_coefficients(x: float, y: float, z: float, radians: float) -> tuple[float, float, float, float]:
+    """Coefficients of quaternion.from_rotation(((x, y, z), radians)), memoized for repeated rotations."""
+    half = radians * 0.5
+    k = math.sin(half) / math.hypot(x, y, z)
+    return (math.cos(half), x * k, y * k, z * k)
 
 
 class qmath:
@@ -229,7 +314,13 @@ class qmath:
     @staticmethod
     def normalized(num: quaternion) -> quaternion:
         """Return proportional quaternion value with length 1."""
-        return num / abs(num)
+        a, b, c, d = num.to_tuple()
+        length = abs(num)
+        inv = 1.0 / length
+        if math.isinf(inv):
+            # Subnormal length: its reciprocal overflows, so divide instead.
+            return quaternion(a / length, b / length, c / length, d / length)
+        return quaternion(a * inv, b * inv, c * inv, d * inv)
 
     @staticmethod
     def exp(num: quaternion) -> quaternion:
@@ -239,21 +330,33 @@ class qmath:
         https://en.wikipedia.org/wiki/Quaternion#Exponential,_logarithm,_and_power_functions
         """
         v = num.to_imag()
+        if not v:
+            return quaternion(pow(math.e, num.a))
         av = abs(v)
-        return pow(math.e, num.a) * (math.cos(av) + normalized(v) * math.sin(av))
+        return pow(math.e, num.a) * (math.cos(av) + qmath.normalized(v) * math.sin(av))
 
     @staticmethod
-    def log(num: quaternion, base: quaternion | Real = math.e) -> quaternion:
-        """Returns the logarithm of num to the given base. If the base is not specified, returns the natural logarithm of num."""
-        if isinstance(base, Real):
-            return (math.log(num) + normalized(num.to_imag()) * math.acos(num.a / abs(num))) / math.log(base)
-        if isinstance(base, quaternion):
-            return qmath.log(num) * qmath.inverse(qmath.log(base))
+    def log(num: quaternion, base: quaternion | float = math.e) -> quaternion:
+        """
+        Returns the logarithm of num to the given base. If the base is not specified, returns the natural logarithm of num.
+
+        A negative real num has no unique imaginary direction, so like cmath.log it gets pi * i.
+        """
+        if not isinstance(base, quaternion):
+            v = num.to_imag()
+            if v:
+                ln = math.log(abs(num)) + qmath.normalized(v) * math.acos(num.a / abs(num))
+            elif num.a < 0:
+                ln = quaternion(math.log(-num.a), math.pi)
+            else:
+                ln = quaternion(math.log(num.a))
+            return ln / math.log(base)
+        return qmath.log(num) * qmath.invert(qmath.log(base))
 
     @staticmethod
-    def pow(base: quaternion | Real, exponent: quaternion | Real):
+    def pow(base: quaternion | float, exponent: quaternion | float):
         """Return base raised to the power exponent."""
-        if isinstance(base, Real):
+        if not isinstance(base, quaternion):
             base = quaternion(base)
         return qmath.exp(qmath.log(base) * exponent)
 
@@ -266,12 +369,29 @@ class qmath:
         """
         if not num:
             raise ZeroDivisionError("Cannot invert (0+0i+0j+0k)")
-        sqr: Real = (num.a * num.a +
+        sqr: float = (num.a * num.a +
                      num.b * num.b +
                      num.c * num.c +
                      num.d * num.d)
-        return num.conjugate() / sqr
+        return quaternion(num.a / sqr, -num.b / sqr, -num.c / sqr, -num.d / sqr)
     
+    @staticmethod
+    def _sandwich_pure(w: float, x: float, y: float, z: float,
+                       vx: float, vy: float, vz: float) -> Vec3:
+        """
+        Return imaginary part of q * (0 + vx i + vy j + vz k) * conjugate(q) for a unit q = (w, x, y, z).
+
+        The middle factor has no real part, so the two Hamilton products reduce to
+        v' = v + w * t + (x, y, z) × t,  where t = 2 * (x, y, z) × v
+        https://fgiesen.wordpress.com/2019/02/09/rotating-a-single-vector-using-a-quaternion/
+        """
+        tx = 2 * (y * vz - z * vy)
+        ty = 2 * (z * vx - x * vz)
+        tz = 2 * (x * vy - y * vx)
+        return (vx + w * tx + y * tz - z * ty,
+                vy + w * ty + z * tx - x * tz,
+                vz + w * tz + x * ty - y * tx)
+
     @staticmethod
     def rotate_by_quaternion(vec: Vec3, q: quaternion) -> Vec3:
         """
@@ -280,28 +400,112 @@ class qmath:
         https://en.wikipedia.org/wiki/Quaternions_and_spatial_rotation#Using_quaternions_as_rotations
 
         vec - 3-dimentional vector to be rotated.
-        q   - quaternion representing the rotation.
+        q   - unit quaternion representing the rotation.
 
         returns a rotated vector.
         """
-        return (q * quaternion(0, *vec) / q).to_rotation()[0]
+        return qmath._sandwich_pure(q.a, q.b, q.c, q.d, *vec)
 
     @staticmethod
-    def rotate(vec: Vec3, rotation: Rotation) -> Vec3:
+    def as_rotationq(rotation: Rotation) -> RotationQ:
+        """Convert a Rotation to a RotationQ for repeated use with qmath.rotate."""
+        return RotationQ(*quaternion.from_rotation(rotation).to_tuple())
+
+    @staticmethod
+    def rotate(vec: Vec3, rotation: Rotation | RotationQ) -> Vec3:
         """
-        Rotate a vector using the Rotation type.
+        Rotate a vector using the Rotation or RotationQ type.
 
         https://en.wikipedia.org/wiki/Quaternions_and_spatial_rotation#Using_quaternions_as_rotations
 
         vec      - 3-dimentional vector to be rotated.
-        rotation - tuple of (axis, angle in radians).
+        rotation - tuple of (axis, angle in radians) or RotationQ.
 
         returns a rotated vector.
         """
+        if isinstance(rotation, RotationQ):
+            return qmath._sandwich_pure(*rotation, *vec)
         q = quaternion.from_rotation(rotation)
-        return (q * quaternion(0, *vec) * q.conjugate()).to_tuple()[1:]
+        return qmath._sandwich_pure(q.a, q.b, q.c, q.d, *vec)
+
+    @staticmethod
+    def rotate_batch(points: np.ndarray, rotation: Rotation) -> np.ndarray:
+        """
+        Rotate many vectors at once using the Rotation type.
+
+        Same as qmath.rotate applied to every row, but converts the rotation
+        to a 3x3 matrix once and rotates all points with a single matrix product.
+
+        points   - array of shape (N, 3) with vectors to be rotated.
+        rotation - tuple of (axis, angle in radians).
+
+        returns an array of shape (N, 3) with rotated vectors.
+        """
+        m = np.asarray(qmath.to_matrix3(quaternion.from_rotation(rotation))).reshape(3, 3)
+        return np.asarray(points, dtype=np.float64) @ m.T
+
+    @staticmethod
+    def to_matrix3(q: quaternion) -> tuple[float, float, float, float, float, float, float, float, float]:
+        """
+        Return the 3x3 rotation matrix of a unit quaternion as 9 entries in row-major order.
+
+        https://en.wikipedia.org/wiki/Quaternions_and_spatial_rotation#Quaternion-derived_rotation_matrix
+        """
+        w, x, y, z = q.to_tuple()
+        xx, yy, zz = x * x, y * y, z * z
+        xy, xz, yz = x * y, x * z, y * z
+        wx, wy, wz = w * x, w * y, w * z
+        return (1 - 2 * (yy + zz),     2 * (xy - wz),     2 * (xz + wy),
+                    2 * (xy + wz), 1 - 2 * (xx + zz),     2 * (yz - wx),
+                    2 * (xz - wy),     2 * (yz + wx), 1 - 2 * (xx + yy))
+
+    @staticmethod
+    def rotate_many(vecs: np.ndarray, axis: Vec3, angle: float) -> np.ndarray:
+        """
+        Rotate many vectors at once around an axis by an angle.
+
+        Uses a Numba kernel when numba is installed and qmath.rotate_batch otherwise.
+
+        vecs  - array of shape (N, 3) with vectors to be rotated.
+        axis  - axis of rotation.
+        angle - angle in radians.
+
+        returns an array of shape (N, 3) with rotated vectors.
+        """
+        vecs = np.ascontiguousarray(vecs, dtype=np.float64)
+        if vecs.ndim != 2 or vecs.shape[1] != 3:
+            raise ValueError("Expected an array of shape (N, 3), got {}".format(vecs.shape))
+        if _rotate_kernel is None:
+            return qmath.rotate_batch(vecs, (axis, angle))
+        q = quaternion.from_rotation((axis, angle))
+        out = np.empty_like(vecs)
+        _rotate_kernel(vecs, q.a, q.b, q.c, q.d, out)
+        return out
+
+    @staticmethod
+    def conjugate_batch(coefficients: np.ndarray) -> np.ndarray:
+        """
+        Return conjugates of many quaternions at once.
+
+        Same as quaternion.conjugate applied to every row, but flips the sign bits
+        of the imaginary coefficients with a single XOR over the whole array.
+
+        coefficients - array of shape (N, 4) with rows (a, b, c, d).
+
+        returns an array of shape (N, 4) with rows (a, -b, -c, -d).
+        """
+        coefficients = np.ascontiguousarray(coefficients, dtype=np.float64)
+        return (coefficients.view(np.uint64) ^ _CONJ_MASK).view(np.float64)
 
     @staticmethod
     def isclose(a: quaternion, b: quaternion, **kwargs) -> bool:
         """Check if two quaternions are close to each other in value."""
         return math.isclose(abs(a - b), 0, **kwargs)
+
+
+try:
+    # Compiled drop-in replacement, built with `$ python setup.py build_ext --inplace`.
+    # qmath only uses the public interface, so it works with either class.
+    from _quaternion import quaternion  # type: ignore
+except ImportError:
+    pass
@@ -0,0 +1,32 @@
+#!/usr/bin/env python
+"""
+Optional compiled builds of the quaternion module.
+
+$ python setup.py build_ext --inplace
+    builds _quaternion.pyx with Cython, if it is installed.
+
+$ QUATERNION_MYPYC=1 python setup.py build_ext --inplace
+    compiles quaternion.py itself with mypyc instead.
+
+Without either, the pure-Python quaternion.py is used as is.
+"""
+
+import os
+
+from setuptools import setup
+
+if os.environ.get("QUATERNION_MYPYC"):
+    from mypyc.build import mypycify
+    ext_modules = mypycify(["quaternion.py"])
+else:
+    try:
+        from Cython.Build import cythonize
+        ext_modules = cythonize(["_quaternion.pyx"])
+    except ImportError:
+        ext_modules = []
+
+setup(
+    name="quaternion",
+    py_modules=["quaternion"],
+    ext_modules=ext_modules,
+)
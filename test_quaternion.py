@@ -2,6 +2,7 @@ import pytest
 from quaternion import quaternion, qmath
 import math
 import itertools as itt
+import numpy as np
 
 qeq = qmath.isclose
 
@@ -39,16 +40,45 @@ def zero_qs():
 def all_qs(nonzero_qs, zero_qs):
     return nonzero_qs + zero_qs
 
+def qmul(A, B):
+    """Hamilton product of arrays of quaternion coefficients with shape (..., 4)."""
+    a1, b1, c1, d1 = np.moveaxis(A, -1, 0)
+    a2, b2, c2, d2 = np.moveaxis(B, -1, 0)
+    return np.stack([
+        a1 * a2 - b1 * b2 - c1 * c2 - d1 * d2,
+        a1 * b2 + b1 * a2 + c1 * d2 - d1 * c2,
+        a1 * c2 - b1 * d2 + c1 * a2 + d1 * b2,
+        a1 * d2 + b1 * c2 - c1 * b2 + d1 * a2], axis=-1)
+
 def test_sanity(all_qs):
     """Test whether same quaternions are equal and different are not equal."""
     assert all((a is b) == qmath.isclose(a, b) for a, b in itt.product(all_qs, repeat=2))
 
+def test_equality(all_qs):
+    """Test value equality and hashing of quaternions."""
+    assert all((a == b) == qmath.isclose(a, b) for a, b in itt.product(all_qs, repeat=2))
+    assert all(a == quaternion(*a.to_tuple()) and hash(a) == hash(quaternion(*a.to_tuple())) for a in all_qs)
+    assert quaternion(2) == 2 and hash(quaternion(2)) == hash(2)
+    assert quaternion(2, 1) != 2
+
 def test_abs(basis_qs, two_qs, four_qs, zero_qs):
     """Test quaternion's lengths against known values."""
     assert all(map(lambda q: math.isclose(abs(q), 1), basis_qs))
     assert all(map(lambda q: math.isclose(abs(q), pow(2, 1/2)), two_qs))
     assert all(map(lambda q: math.isclose(abs(q), 2), four_qs))
     assert all(map(lambda q: math.isclose(abs(q), 0), zero_qs))
+    assert math.isclose(abs(quaternion(3e200, 0, 0, 4e200)), 5e200)
+    assert math.isclose(abs(quaternion(0, 3e-200, 4e-200)), 5e-200)
+
+def test_normalized(nonzero_qs):
+    """Test that normalized quaternions have length 1, including very large, very small and subnormal ones."""
+    assert all(math.isclose(abs(qmath.normalized(q)), 1) for q in nonzero_qs)
+    assert qmath.isclose(qmath.normalized(quaternion(1e200)), quaternion(1), abs_tol=1e-9)
+    assert qmath.isclose(qmath.normalized(quaternion(0, 1e-200)), quaternion(0, 1), abs_tol=1e-9)
+    assert qmath.isclose(qmath.normalized(quaternion(1e-310)), quaternion(1), abs_tol=1e-9)
+    assert qmath.isclose(qmath.normalized(quaternion(0, 0, 3e-310, -4e-310)), quaternion(0, 0, 0.6, -0.8), abs_tol=1e-9)
+    with pytest.raises(ZeroDivisionError):
+        qmath.normalized(quaternion())
 
 def test_basis_multiplication(basis_qs):
     """
@@ -89,13 +119,20 @@ def test_algebra(all_qs, nonzero_qs):
 
     https://en.wikipedia.org/wiki/Quaternion#Algebraic_properties
     """
-    assert all(qmath.isclose((a + b) + c, a + (b + c)) for a, b, c in itt.product(all_qs, repeat=3))
-    assert all(qmath.isclose(a + b, b + a) for a, b in itt.product(all_qs, repeat=2))
+    # Pairwise sums and products of quaternion objects are checked against
+    # their array counterparts, then the laws are checked on whole arrays.
+    A = np.array([q.to_tuple() for q in all_qs])
+    assert np.allclose(np.array([[(a + b).to_tuple() for b in all_qs] for a in all_qs]), A[:, None] + A[None, :])
+    assert np.allclose(np.array([[(a * b).to_tuple() for b in all_qs] for a in all_qs]), qmul(A[:, None], A[None, :]))
 
-    assert all(qmath.isclose((a * b) * c, a * (b * c)) for a, b, c in itt.product(all_qs, repeat=3))
-    assert all(qmath.isclose(a * (b + c), a * b + a * c) for a, b, c in itt.product(all_qs, repeat=3))
-    assert all(qmath.isclose((a + b) * c, a * c + b * c) for a, b, c in itt.product(all_qs, repeat=3))
-    assert any(not qmath.isclose(a * b, b * a) for a, b in itt.product(all_qs, repeat=2))
+    a, b, c = A[:, None, None], A[None, :, None], A[None, None, :]
+    assert np.allclose((a + b) + c, a + (b + c))
+    assert np.allclose(a + b, b + a)
+
+    assert np.allclose(qmul(qmul(a, b), c), qmul(a, qmul(b, c)))
+    assert np.allclose(qmul(a, b + c), qmul(a, b) + qmul(a, c))
+    assert np.allclose(qmul(a + b, c), qmul(a, c) + qmul(b, c))
+    assert not np.allclose(qmul(a, b), qmul(b, a))
 
     assert all(qmath.isclose(quaternion() + a, a) and qmath.isclose(a + quaternion(), a) for a in all_qs)
     assert all(qmath.isclose(quaternion(1) * a, a) and qmath.isclose(a * quaternion(1), a) for a in all_qs)
@@ -116,7 +153,7 @@ def test_overloads():
     >>> set(dir(1j)) - set(dir(object()))
     {'__sub__', '__truediv__', '__pow__', 'conjugate', '__mul__', '__neg__', '__rtruediv__', '__rmul__', '__abs__', '__complex__', 'real', '__pos__', '__radd__', '__add__', '__getnewargs__', '__rsub__', 'imag', '__bool__', '__rpow__'}
     """
-    assert qmath.isclose(one + , two)
+    assert qmath.isclose(one + one, two)
     assert qmath.isclose(one + 1, two)
     assert qmath.isclose(1 + one, two)
 
@@ -131,4 +168,112 @@ def test_overloads():
     assert qmath.isclose(one / one, one)
     assert qmath.isclose(one / 1, one)
     assert qmath.isclose(1 / one, one)
+    assert qmath.isclose(two / two, one)
+    assert qmath.isclose(quaternion(0, 1) / quaternion(0, 0, 1), quaternion(0, 0, 0, -1))
+
+
+def test_exp_log():
+    """Test exponent and logarithm against known values."""
+    assert qmath.isclose(qmath.exp(quaternion(0, math.pi)), quaternion(-1), abs_tol=1e-9)
+    assert qmath.isclose(qmath.exp(quaternion(1, 0, math.pi / 2)), quaternion(0, 0, math.e), abs_tol=1e-9)
+
+    assert qmath.isclose(qmath.log(quaternion(1, 1)), quaternion(math.log(2) / 2, math.pi / 4), abs_tol=1e-9)
+    assert qmath.isclose(qmath.log(quaternion(0, 4), 2), quaternion(2, math.pi / 2 / math.log(2)), abs_tol=1e-9)
+    q = quaternion(1, -2, 3, 0.5)
+    assert qmath.isclose(qmath.exp(qmath.log(q)), q, abs_tol=1e-9)
+
+    assert qmath.isclose(qmath.exp(quaternion(1)), quaternion(math.e), abs_tol=1e-9)
+    assert qmath.isclose(qmath.log(quaternion(2)), quaternion(math.log(2)), abs_tol=1e-9)
+    assert qmath.isclose(qmath.log(quaternion(-1)), quaternion(0, math.pi), abs_tol=1e-9)
+    assert qmath.isclose(quaternion(2) ** 2, quaternion(4), abs_tol=1e-9)
+    assert qmath.isclose(2 ** quaternion(3), quaternion(8), abs_tol=1e-9)
+    for q in (quaternion(3), quaternion(-3), quaternion(0.5, 0, 0, 0)):
+        assert qmath.isclose(qmath.exp(qmath.log(q)), q, abs_tol=1e-9)
+    with pytest.raises(ValueError):
+        qmath.log(quaternion())
+
+    assert qmath.isclose(qmath.log(q, quaternion(math.e)), qmath.log(q), abs_tol=1e-9)
+    assert qmath.isclose(qmath.log(quaternion(8), quaternion(2)), quaternion(3), abs_tol=1e-9)
+
+def test_conjugate(all_qs):
+    """Test batch conjugation against conjugation of single quaternions."""
+    A = np.array([q.to_tuple() for q in all_qs])
+    assert np.array_equal(qmath.conjugate_batch(A), np.array([q.conjugate().to_tuple() for q in all_qs]))
+
+def test_rotation():
+    """Test vector rotation against known values and batch rotation against single rotation."""
+    axis = (0, 0, 1)
+    angle = -math.pi / 2
+    points = [(1, 1, 0), (1, 3, 0), (3, 3, 0), (3, 1, 0)]
+    expected = [(1, -1, 0), (3, -1, 0), (3, -3, 0), (1, -3, 0)]
+
+    rotated = [qmath.rotate(p, (axis, angle)) for p in points]
+    assert all(math.isclose(a, b, abs_tol=1e-9) for p, e in zip(rotated, expected) for a, b in zip(p, e))
+
+    (x, y, z), radians = quaternion.from_rotation(((0, 0, 2), math.pi / 3)).to_rotation()
+    assert math.isclose(x, 0, abs_tol=1e-9) and math.isclose(y, 0, abs_tol=1e-9) and math.isclose(z, 1)
+    assert math.isclose(radians, math.pi / 3)
+    assert quaternion.from_rotation(((0, 0, 1), 0)).to_rotation() == ((1, 0, 0), 0)
+    assert quaternion(1).to_rotation() == ((1, 0, 0), 0)
+
+    rq = qmath.as_rotationq((axis, angle))
+    assert all(math.isclose(a, b) for p in points for a, b in zip(qmath.rotate(p, rq), qmath.rotate(p, (axis, angle))))
+
+    batch = qmath.rotate_batch(np.array(points), (axis, angle))
+    assert batch.shape == (len(points), 3)
+    assert np.allclose(batch, rotated)
+    assert np.allclose(qmath.rotate_many(np.array(points), axis, angle), rotated)
+    for wrong in (np.zeros((4, 2)), np.zeros(3)):
+        with pytest.raises(ValueError):
+            qmath.rotate_many(wrong, axis, angle)
+
+    half = quaternion(math.cos(math.pi / 4), 0, 0, math.sin(math.pi / 4))
+    assert qmath.isclose(quaternion.from_rotation(((0, 0, 1e200), math.pi / 2)), half, abs_tol=1e-9)
+    assert qmath.isclose(quaternion.from_rotation(((0, 0, 1e-200), math.pi / 2)), half, abs_tol=1e-9)
+
+def test_rotate_kernel():
+    """Test the Numba rotation kernel directly, if numba is installed."""
+    pytest.importorskip("numba")
+    from _quaternion_numba import rotate_kernel
+    points = [(1, 1, 0), (1, 3, 0), (3, 3, 0), (3, 1, 0)]
+    rotation = ((1, 2, 3), 0.7)
+    P = np.array(points, dtype=np.float64)
+    out = np.empty_like(P)
+    rotate_kernel(P, *quaternion.from_rotation(rotation).to_tuple(), out)
+    assert np.allclose(out, [qmath.rotate(p, rotation) for p in points])
+
+    with pytest.raises(ValueError):
+        rotate_kernel(np.zeros((4, 2)), 1.0, 0.0, 0.0, 0.0, np.empty((4, 2)))
+    with pytest.raises(ValueError):
+        rotate_kernel(P, 1.0, 0.0, 0.0, 0.0, np.empty((3, 3)))
+
+def test_compiled_quaternion(basis_qs, two_qs, four_qs, zero_qs, all_qs, nonzero_qs):
+    """
+    Run the checks above against the Cython class from _quaternion.pyx.
+
+    Skipped unless the extension is built ($ python setup.py build_ext --inplace).
+    When it is built, quaternion.py exports it instead of the pure-Python class.
+    """
+    compiled = pytest.importorskip("_quaternion").quaternion
+    assert quaternion is compiled
+
+    def convert(qs):
+        return [compiled(*q.to_tuple()) for q in qs]
+
+    test_sanity(convert(all_qs))
+    test_equality(convert(all_qs))
+    test_abs(convert(basis_qs), convert(two_qs), convert(four_qs), convert(zero_qs))
+    test_normalized(convert(nonzero_qs))
+    test_basis_multiplication(convert(basis_qs))
+    test_algebra(convert(all_qs), convert(nonzero_qs))
+    test_conjugate(convert(all_qs))
+    test_overloads()
+    test_exp_log()
+    test_rotation()
+
+    class derived(compiled):
+        pass
 
+    q = derived.from_rotation(((0, 0, 2), math.pi / 3))
+    assert type(q) is derived
+    assert qmath.isclose(q, compiled(math.cos(math.pi / 6), 0, 0, math.sin(math.pi / 6)))